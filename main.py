@@ -6,8 +6,15 @@ AstrBot Plugin: 聊天记录备份
 作者: OmniTopia (https://github.com/Omnitopia)
 """
 
+import asyncio
 import json
+import mmap
+import os
+import queue
 import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -17,6 +24,88 @@ from astrbot.api.event import AstrMessageEvent, filter
 from astrbot.api.event.filter import EventMessageType
 from astrbot.api.star import Context, Star
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 下没有 fcntl，轮转时不加文件锁
+    fcntl = None
+
+# 统计行数时每次处理的字节数
+_COUNT_CHUNK = 1024 * 1024
+# 同时保持打开的备份文件描述符数量上限，超过时关闭最久未使用的
+_MAX_OPEN_FILES = 64
+# 以追加模式打开备份文件（Windows 下需要 O_BINARY 避免换行符被转换）
+_OPEN_FLAGS = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+# 通知写入线程退出的哨兵
+_STOP = object()
+# 统计线程交给写入线程合并已有备份文件统计结果的标记
+_STATS = object()
+# 事件上尚未缓存聊天信息的标记
+_UNRESOLVED = object()
+# 标准库 JSON 编码器：紧凑输出、不转义非 ASCII 字符。
+# 复用同一个实例，避免 json.dumps 带参数调用时每次都新建编码器
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+# JSON 字符串中必须转义的字符（RFC 8259：引号、反斜杠和控制字符）
+_JSON_NEEDS_ESCAPE = re.compile(r'["\\\x00-\x1f]')
+# 从备份文件名中解析聊天类型（兼容轮转后带时间戳后缀的文件名）
+_CHAT_TYPE_RE = re.compile(r"_(private|group)(?:_\d{8}_\d{6})?\.jsonl$")
+
+
+def _dumps_line(message: dict) -> bytes:
+    """将消息记录序列化为一行 JSONL（UTF-8 编码，含结尾换行符）
+
+    优先使用 orjson。未安装时，由于消息记录固定为扁平的字符串字段，
+    字段值无需转义时直接拼接 JSON，绕过通用编码器；需要转义或出现非字符串
+    字段时回退到标准库 json。
+
+    Args:
+        message: 消息记录
+
+    Returns:
+        bytes: 序列化后的行
+    """
+    if orjson is not None:
+        return orjson.dumps(message, option=orjson.OPT_APPEND_NEWLINE)
+    try:
+        # 非字符串字段会使 join 抛出 TypeError
+        plain = not _JSON_NEEDS_ESCAPE.search("".join(message.values()))
+    except TypeError:
+        plain = False
+    if not plain:
+        return (_JSON_ENCODER.encode(message) + "\n").encode("utf-8")
+    body = ",".join(f'"{key}":"{value}"' for key, value in message.items())
+    return ("{" + body + "}\n").encode("utf-8")
+
+
+def _count_lines(path, size: Optional[int] = None) -> int:
+    """统计文件行数（即 JSONL 记录条数）
+
+    通过 mmap 映射文件后按块用 bytes.count 统计换行符，不为每行创建
+    Python 对象，内存占用与文件大小无关。
+
+    Args:
+        path: 文件路径
+        size: 只统计前 size 个字节（可选），默认统计整个文件
+
+    Returns:
+        int: 行数
+    """
+    with open(path, "rb") as fp:
+        # 0 字节文件无法 mmap
+        if os.fstat(fp.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = len(mm) if size is None else min(size, len(mm))
+            return sum(
+                mm[i : min(i + _COUNT_CHUNK, end)].count(b"\n")
+                for i in range(0, end, _COUNT_CHUNK)
+            )
+
 
 class Main(Star):
     """聊天记录备份插件
@@ -38,6 +127,46 @@ class Main(Star):
         super().__init__(context)
         self.config = config or {}
         self.web_server = None
+        self._load_config()
+
+        # 备份文件路径缓存：(chat_id, is_group) -> 路径字符串
+        self._path_cache: dict[tuple[str, bool], str] = {}
+        # 写入队列：消息处理协程只负责入队，由后台写入线程消费并落盘
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        # 同一轮事件循环内产生的待写入行，按文件合并后一次性交给写入线程
+        self._tick_buf: dict[str, list[bytes]] = {}
+        # 写入缓冲：按文件路径聚合待写入的数据，达到条数/字节阈值或定时器到期时批量落盘
+        self._pending: dict[str, list[bytes]] = defaultdict(list)
+        self._pending_bytes: dict[str, int] = defaultdict(int)
+        self._pending_count: dict[str, int] = defaultdict(int)
+        # 文件大小（字节），取自写入后描述符的偏移量，由写入线程维护
+        self._size_cache: dict[str, int] = {}
+        # 各文件下一次需要检查轮转的大小阈值（字节），未设置时为 max_file_size_mb
+        self._next_rotate_check: dict[str, int] = {}
+        # 各文件的消息条数，仅在内存中累加，轮转和卸载时写入元数据文件
+        self._msg_counts: Counter[str] = Counter()
+        # 文件描述符缓存（LRU），写入时复用已打开的描述符，由写入线程维护
+        self._fd_cache: OrderedDict[str, int] = OrderedDict()
+        # 事件类型能力缓存：(是否有 is_group_message, 是否有 get_sender_name)
+        self._caps: dict[type, tuple[bool, bool]] = {}
+        # 最近一次格式化的时间戳（毫秒）及其 ISO 8601 字符串
+        self._ts_ms = 0
+        self._ts_iso = ""
+        # 备份统计快照：只由写入线程修改，随每次写入增量更新，供 WebUI 直接读取。
+        # 已有备份文件由统计线程在后台统计，完成后交给写入线程合并，
+        # 此前 loading 为 True
+        self.stats = {
+            "total_chats": 0,
+            "total_messages": 0,
+            "total_size_bytes": 0,
+            "private_chats": 0,
+            "group_chats": 0,
+            "loading": True,
+        }
+        # 写入线程新建的备份文件，合并启动统计时跳过（已在新建时计入）
+        self._created: set[str] = set()
+        # 写入线程首次打开已有备份文件时的大小，启动统计只统计这部分内容
+        self._base_sizes: dict[str, int] = {}
 
         # 获取插件数据目录 - 遵循 AstrBot 插件存储规范
         plugin_name = getattr(self, "name", "astrbot_plugin_history")
@@ -55,9 +184,44 @@ class Main(Star):
                 self.data_dir = Path("data") / "plugin_data" / plugin_name
 
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        # 写入路径上统一使用字符串路径，避免每条消息都创建 Path 对象
+        self._data_dir_str = str(self.data_dir)
+
+        # 后台写入线程：唯一访问备份文件的线程，负责批量写入与轮转
+        self._writer = threading.Thread(
+            target=self._writer_loop, name="history-writer", daemon=True
+        )
+        self._writer.start()
+        # 后台统计线程：统计已有备份文件，不阻塞写入
+        threading.Thread(
+            target=self._load_stats, name="history-stats", daemon=True
+        ).start()
 
         logger.info(f"📦 聊天记录备份插件已加载，数据目录: {self.data_dir}")
 
+    def _load_config(self) -> None:
+        """将每条消息都要用到的配置项预先解析为实例属性
+
+        AstrBot 在配置变更后会重新加载插件，届时会重新调用本方法。
+        """
+        config = self.config
+        self._enable_private = bool(config.get("enable_private", True))
+        self._enable_group = bool(config.get("enable_group", True))
+        self._save_sysinfo = bool(config.get("save_system_info", True))
+        # 群聊白名单/黑名单，转为集合以便每条消息 O(1) 查找
+        self._whitelist = frozenset(
+            str(x) for x in config.get("group_whitelist", []) or ()
+        )
+        self._blacklist = frozenset(
+            str(x) for x in config.get("group_blacklist", []) or ()
+        )
+        # 文件轮转阈值（字节），默认 10MB
+        self._max_bytes = int(config.get("max_file_size_mb", 10) * 1024 * 1024)
+        # 写入批量阈值至少为 1；刷新间隔不低于 10ms，避免写入线程空转
+        self._flush_batch_size = max(1, int(config.get("flush_batch_size", 20)))
+        self._flush_bytes = max(1, int(config.get("flush_bytes", 65536)))
+        self._flush_interval = max(0.01, config.get("flush_interval_ms", 1000) / 1000)
+
     async def initialize(self):
         """插件初始化 - 启动 WebUI"""
         if self.config.get("enable_webui", True):
@@ -71,58 +235,281 @@ class Main(Star):
             except Exception as e:
                 logger.error(f"❌ WebUI 启动失败: {e}", exc_info=True)
 
-    def _get_file_path(self, chat_id: str, is_group: bool) -> Path:
-        """获取备份文件路径
+    def _get_file_path(self, chat_id: str, is_group: bool) -> str:
+        """获取备份文件路径（按聊天缓存，同一聊天始终返回同一个字符串）
 
         Args:
             chat_id: 聊天 ID（QQ 号或群号）
             is_group: 是否为群聊
 
         Returns:
-            Path: 备份文件路径
+            str: 备份文件路径
         """
-        msg_type = "group" if is_group else "private"
-        # 使用 JSONL 格式，每行一条记录，便于追加写入
-        filename = f"{chat_id}_{msg_type}.jsonl"
-        return self.data_dir / filename
-
-    def _get_file_size_mb(self, file_path: Path) -> float:
-        """获取文件大小（MB）
+        key = (chat_id, is_group)
+        file_path = self._path_cache.get(key)
+        if file_path is None:
+            msg_type = "group" if is_group else "private"
+            # 使用 JSONL 格式，每行一条记录，便于追加写入
+            filename = f"{chat_id}_{msg_type}.jsonl"
+            file_path = self._path_cache[key] = f"{self._data_dir_str}{os.sep}{filename}"
+        return file_path
+
+    def _get_meta_path(self, file_path: str) -> str:
+        """获取备份文件对应的元数据文件路径（<聊天>_meta.json）
 
         Args:
-            file_path: 文件路径
+            file_path: 备份文件路径
 
         Returns:
-            float: 文件大小（MB）
+            str: 元数据文件路径
         """
-        if not file_path.exists():
-            return 0.0
-        return file_path.stat().st_size / (1024 * 1024)
+        return os.path.splitext(file_path)[0] + "_meta.json"
 
-    def _should_rotate_file(self, file_path: Path) -> bool:
-        """检查是否需要轮转文件（超过最大大小）
+    def _read_meta(self, file_path: str) -> dict:
+        """读取备份文件的元数据
 
         Args:
-            file_path: 文件路径
+            file_path: 备份文件路径
 
         Returns:
-            bool: 是否需要轮转
+            dict: 元数据，文件不存在或损坏时为空字典
+        """
+        try:
+            with open(self._get_meta_path(file_path), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        # 内容合法但不是对象（如 []）时同样视为损坏
+        return meta if isinstance(meta, dict) else {}
+
+    def _write_meta(self, file_path: str, segment: Optional[dict] = None) -> None:
+        """写入备份文件的元数据（仅在轮转和卸载时调用）
+
+        Args:
+            file_path: 备份文件路径
+            segment: 刚轮转出的历史文件信息（可选），追加到 segments 列表
         """
-        max_size = self.config.get("max_file_size_mb", 10)  # 默认 10MB
-        return self._get_file_size_mb(file_path) > max_size
+        segments = self._read_meta(file_path).get("segments", [])
+        if segment:
+            segments.append(segment)
+        meta = {
+            "file": os.path.basename(file_path),
+            "message_count": self._msg_counts[file_path],
+            "size": self._size_cache.get(file_path, 0),
+            "updated_at": datetime.now().isoformat(),
+            "segments": segments,
+        }
 
-    def _rotate_file(self, file_path: Path) -> None:
+        # 先写临时文件再替换，避免中途失败留下损坏的元数据
+        meta_path = self._get_meta_path(file_path)
+        tmp_path = meta_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(_JSON_ENCODER.encode(meta))
+            os.replace(tmp_path, meta_path)
+        except IOError as e:
+            logger.error(f"❌ 写入元数据失败: {e}", exc_info=True)
+
+    def _count_messages(self, file_path: str, size: int) -> int:
+        """获取备份文件中已有的消息条数
+
+        元数据记录的大小与文件实际大小一致时直接使用其中的条数，否则重新统计。
+
+        Args:
+            file_path: 备份文件路径
+            size: 文件实际大小（字节）
+
+        Returns:
+            int: 消息条数
+        """
+        if not size:
+            return 0
+        meta = self._read_meta(file_path)
+        if meta.get("size") == size and "message_count" in meta:
+            return meta["message_count"]
+        return _count_lines(file_path)
+
+    def _rotate_file(self, file_path: str) -> None:
         """轮转文件（重命名为带时间戳的文件）
 
+        多进程部署时只在轮转期间持有 flock 排他锁，普通追加写入不加锁。
+        获得锁后若发现文件已被其他进程轮转，则只切换到新文件。
+
         Args:
             file_path: 需要轮转的文件路径
         """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        new_name = file_path.stem + f"_{timestamp}" + file_path.suffix
-        new_path = file_path.parent / new_name
-        file_path.rename(new_path)
+        base, ext = os.path.splitext(file_path)
+        new_path = f"{base}_{timestamp}{ext}"
+        new_name = os.path.basename(new_path)
+        segment = {
+            "file": new_name,
+            "message_count": self._msg_counts[file_path],
+            "size": self._size_cache.get(file_path, 0),
+        }
+        fd = self._fd_cache.get(file_path)
+        if fcntl is None or fd is None:
+            # 先关闭文件再重命名（Windows 下无法重命名已打开的文件）
+            self._close_fd(file_path)
+            os.rename(file_path, new_path)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                try:
+                    rotated_elsewhere = os.stat(file_path).st_ino != os.fstat(fd).st_ino
+                except FileNotFoundError:
+                    rotated_elsewhere = True
+                if not rotated_elsewhere:
+                    os.rename(file_path, new_path)
+            finally:
+                # 关闭描述符的同时释放锁
+                self._close_fd(file_path)
+
+            if rotated_elsewhere:
+                # 重新打开时从新文件重新读取大小和消息条数
+                self._size_cache.pop(file_path, None)
+                self._msg_counts.pop(file_path, None)
+                self._next_rotate_check.pop(file_path, None)
+                return
+
+        self._size_cache[file_path] = 0
+        self._msg_counts[file_path] = 0
+        self._next_rotate_check.pop(file_path, None)
+        self._write_meta(file_path, segment)
         logger.info(f"📁 备份文件已轮转: {new_name}")
 
+    def _get_fd(self, file_path: str) -> int:
+        """获取文件的追加写入描述符，优先复用缓存中已打开的描述符
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            int: 以 O_APPEND 模式打开的文件描述符
+        """
+        fd = self._fd_cache.get(file_path)
+        if fd is not None:
+            self._fd_cache.move_to_end(file_path)
+            return fd
+
+        try:
+            fd = os.open(file_path, _OPEN_FLAGS | os.O_EXCL, 0o644)
+            self._created.add(file_path)
+            self._count_new_file(file_path)
+        except FileExistsError:
+            fd = os.open(file_path, _OPEN_FLAGS, 0o644)
+        self._fd_cache[file_path] = fd
+        # 打开时定位到文件末尾即可得到当前大小，无需额外 stat()
+        size = self._size_cache[file_path] = os.lseek(fd, 0, os.SEEK_END)
+        self._base_sizes.setdefault(file_path, size)
+        if file_path not in self._msg_counts:
+            self._msg_counts[file_path] = self._count_messages(file_path, size)
+        if len(self._fd_cache) > _MAX_OPEN_FILES:
+            _, oldest = self._fd_cache.popitem(last=False)
+            os.close(oldest)
+        return fd
+
+    def _count_new_file(self, file_path: str) -> None:
+        """新建备份文件时更新统计快照中的聊天数
+
+        Args:
+            file_path: 文件路径
+        """
+        self.stats["total_chats"] += 1
+        match = _CHAT_TYPE_RE.search(file_path)
+        if match:
+            self.stats[f"{match.group(1)}_chats"] += 1
+
+    def _load_stats(self) -> None:
+        """统计已有备份文件（在统计线程中执行一次），结果交给写入线程合并
+
+        各元数据文件中记录了当前文件及其所有轮转文件的大小和条数，大小一致时
+        直接使用，只有未被元数据覆盖的文件才重新统计行数。
+        """
+        results = []
+        try:
+            with os.scandir(self._data_dir_str) as it:
+                entries = [e for e in it if e.is_file()]
+
+            # 文件名 -> (大小, 条数)
+            known: dict[str, tuple] = {}
+            for entry in entries:
+                if entry.name.endswith("_meta.json"):
+                    file_path = entry.path[: -len("_meta.json")] + ".jsonl"
+                    meta = self._read_meta(file_path)
+                    segments = meta.get("segments")
+                    if not isinstance(segments, list):
+                        segments = []
+                    for item in [meta, *segments]:
+                        if isinstance(item, dict) and "file" in item:
+                            known[item["file"]] = (
+                                item.get("size"),
+                                item.get("message_count"),
+                            )
+
+            for entry in entries:
+                if not entry.name.endswith(".jsonl"):
+                    continue
+                try:
+                    size = entry.stat().st_size
+                    # stat 之后再读取：写入线程已追加过的文件只统计追加前的部分
+                    size = min(size, self._base_sizes.get(entry.path, size))
+                    size_known, count = known.get(entry.name, (None, None))
+                    if size_known != size or not isinstance(count, int):
+                        count = _count_lines(entry.path, size) if size else 0
+                except IOError as e:
+                    logger.error(f"❌ 统计备份文件失败: {e}", exc_info=True)
+                    continue
+                results.append((entry.path, size, count))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"❌ 统计现有备份文件失败: {e}", exc_info=True)
+
+        self._queue.put((_STATS, results, 0))
+
+    def _merge_stats(self, results: list[tuple[str, int, int]]) -> None:
+        """在写入线程中合并启动时统计的已有备份文件
+
+        Args:
+            results: (文件路径, 大小, 条数) 列表
+        """
+        for file_path, size, count in results:
+            if file_path in self._created:
+                continue
+            self._count_new_file(file_path)
+            self.stats["total_messages"] += count
+            self.stats["total_size_bytes"] += size
+        self.stats["loading"] = False
+
+    def _close_fd(self, file_path: str) -> None:
+        """关闭并移除缓存中的文件描述符
+
+        Args:
+            file_path: 文件路径
+        """
+        fd = self._fd_cache.pop(file_path, None)
+        if fd is not None:
+            try:
+                os.close(fd)
+            except IOError as e:
+                logger.error(f"❌ 关闭文件失败: {e}", exc_info=True)
+
+    def _now_iso(self) -> str:
+        """获取当前时间的 ISO 8601 字符串
+
+        同一毫秒内到达的消息复用同一个已格式化的时间戳。
+
+        Returns:
+            str: ISO 8601 格式的当前时间
+        """
+        now = time.time()
+        ms = int(now * 1000)
+        if ms != self._ts_ms:
+            self._ts_ms = ms
+            self._ts_iso = datetime.fromtimestamp(now).isoformat()
+        return self._ts_iso
+
     def _save_message(
         self,
         chat_id: str,
@@ -132,7 +519,7 @@ class Main(Star):
         sender_id: Optional[str] = None,
         sender_name: Optional[str] = None,
     ) -> None:
-        """保存单条消息到文件（追加写入 JSONL 格式）
+        """保存单条消息（放入写入队列，由写入线程批量追加写入 JSONL 文件）
 
         Args:
             chat_id: 聊天 ID
@@ -144,19 +531,15 @@ class Main(Star):
         """
         file_path = self._get_file_path(chat_id, is_group)
 
-        # 检查是否需要轮转
-        if self._should_rotate_file(file_path):
-            self._rotate_file(file_path)
-
         # 构建消息记录
         message = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self._now_iso(),
             "role": role,
             "content": content,
         }
 
         # 添加系统信息（如果启用）
-        if self.config.get("save_system_info", True):
+        if self._save_sysinfo:
             if sender_id:
                 message["sender_id"] = sender_id
             if sender_name:
@@ -164,14 +547,159 @@ class Main(Star):
             if is_group:
                 message["group_id"] = chat_id
 
-        # 追加写入 JSONL 格式（每行一条 JSON 记录）
         try:
-            with open(file_path, "a", encoding="utf-8") as f:
-                f.write(json.dumps(message, ensure_ascii=False) + "\n")
-        except IOError as e:
-            logger.error(f"❌ 写入文件失败: {e}", exc_info=True)
+            line = _dumps_line(message)
         except (TypeError, ValueError) as e:
             logger.error(f"❌ JSON 序列化失败: {e}", exc_info=True)
+            return
+
+        # 同一轮事件循环内对同一文件的多次保存合并为一次入队
+        lines = self._tick_buf.get(file_path)
+        if lines is None:
+            try:
+                asyncio.get_running_loop().call_soon(self._flush_tick, file_path)
+            except RuntimeError:
+                # 不在事件循环中调用时直接交给写入线程
+                self._queue.put((file_path, line, 1))
+                return
+            lines = self._tick_buf[file_path] = []
+        lines.append(line)
+
+    def _flush_tick(self, file_path: str) -> None:
+        """将本轮事件循环内某个文件的待写入行合并后交给写入线程
+
+        Args:
+            file_path: 文件路径
+        """
+        lines = self._tick_buf.pop(file_path, None)
+        if lines:
+            self._queue.put((file_path, b"".join(lines), len(lines)))
+
+    def _buffer(self, file_path: str, data: bytes, count: int) -> bool:
+        """将若干行记录放入写入缓冲
+
+        Args:
+            file_path: 文件路径
+            data: 序列化后的 JSONL 行（可能包含多行）
+            count: data 中的记录条数
+
+        Returns:
+            bool: 该文件的缓冲是否已达到批量写入阈值
+        """
+        self._pending[file_path].append(data)
+        self._pending_bytes[file_path] += len(data)
+        self._pending_count[file_path] += count
+        return (
+            self._pending_count[file_path] >= self._flush_batch_size
+            or self._pending_bytes[file_path] >= self._flush_bytes
+        )
+
+    def _take_pending(self, paths) -> dict[str, tuple[list[bytes], int]]:
+        """取出指定文件的缓冲内容
+
+        Args:
+            paths: 文件路径列表
+
+        Returns:
+            dict[str, tuple[list[bytes], int]]: 文件路径到 (待写入数据, 记录条数) 的映射
+        """
+        batches = {}
+        for file_path in paths:
+            chunks = self._pending.pop(file_path, None)
+            self._pending_bytes.pop(file_path, None)
+            count = self._pending_count.pop(file_path, 0)
+            if chunks:
+                batches[file_path] = (chunks, count)
+        return batches
+
+    def _write_batches(self, batches: dict[str, tuple[list[bytes], int]]) -> None:
+        """将缓冲内容逐文件一次性追加写入（JSONL 格式，每行一条 JSON 记录）
+
+        由写入线程调用，不会阻塞事件循环。多进程同时写入同一文件时依赖
+        O_APPEND 保证每次 write 原子地追加到文件末尾，因此写入路径不加锁。
+
+        Args:
+            batches: 文件路径到 (待写入数据, 记录条数) 的映射
+        """
+        for file_path, (chunks, count) in batches.items():
+            # 整批拼接为一个缓冲区，通常一次 write 系统调用即可写完
+            payload = b"".join(chunks)
+            try:
+                fd = self._get_fd(file_path)
+                view = memoryview(payload)
+                while view:
+                    view = view[os.write(fd, view) :]
+                # O_APPEND 写入后描述符位于文件末尾，偏移量即为文件大小
+                size = self._size_cache[file_path] = os.lseek(fd, 0, os.SEEK_CUR)
+                self._msg_counts[file_path] += count
+                self.stats["total_messages"] += count
+                self.stats["total_size_bytes"] += len(payload)
+            except IOError as e:
+                # 写入失败时文件状态未知，关闭文件并在重新打开时重新统计
+                self._close_fd(file_path)
+                self._size_cache.pop(file_path, None)
+                self._msg_counts.pop(file_path, None)
+                logger.error(f"❌ 写入文件失败: {e}", exc_info=True)
+                continue
+
+            # 仅当写入使文件越过轮转阈值时才轮转，下一批写入新文件；
+            # 轮转失败时临时调高阈值，避免每批写入都重试
+            if size >= self._next_rotate_check.get(file_path, self._max_bytes):
+                try:
+                    self._rotate_file(file_path)
+                except IOError as e:
+                    self._next_rotate_check[file_path] = (
+                        self._size_cache[file_path] + self._flush_bytes
+                    )
+                    logger.error(f"❌ 备份文件轮转失败: {e}", exc_info=True)
+
+    def _writer_loop(self) -> None:
+        """写入线程：消费写入队列，按阈值或定时批量落盘
+
+        只有这一个线程会访问备份文件及其描述符，无需加锁。
+        """
+        interval = self._flush_interval
+        deadline = time.monotonic() + interval
+        stopping = False
+
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            # 一次取完队列中已有的消息
+            ready = {}
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                elif item[0] is _STATS:
+                    try:
+                        self._merge_stats(item[1])
+                    except Exception as e:
+                        logger.error(f"❌ 合并备份统计失败: {e}", exc_info=True)
+                elif self._buffer(*item):
+                    ready[item[0]] = None
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if stopping or time.monotonic() >= deadline:
+                ready = dict.fromkeys(self._pending)
+                deadline = time.monotonic() + interval
+
+            batches = self._take_pending(ready)
+            if batches:
+                try:
+                    self._write_batches(batches)
+                except Exception as e:
+                    logger.error(f"❌ 批量写入失败: {e}", exc_info=True)
+
+        for file_path in list(self._fd_cache):
+            self._close_fd(file_path)
+        for file_path in list(self._msg_counts):
+            self._write_meta(file_path)
 
     def _extract_text(self, event: AstrMessageEvent) -> str:
         """从事件中提取文本内容
@@ -190,21 +718,16 @@ class Main(Star):
                 if not message:
                     return ""
 
-                text_parts = []
-                for seg in getattr(message, "message", []):
-                    seg_type = getattr(seg, "type", None)
-
-                    # 跳过 reply 类型的消息段（引用消息的元数据）
-                    if seg_type == "reply":
-                        continue
-
-                    # 提取文本
-                    if hasattr(seg, "text") and seg.text:
-                        text = seg.text.strip()
-                        if text:
-                            text_parts.append(text)
-
-                content = " ".join(text_parts).strip()
+                # 提取文本，跳过 reply 类型的消息段（引用消息的元数据）
+                content = " ".join(
+                    text
+                    for text in (
+                        (getattr(seg, "text", None) or "").strip()
+                        for seg in getattr(message, "message", [])
+                        if getattr(seg, "type", None) != "reply"
+                    )
+                    if text
+                )
 
             # 过滤 @昵称(QQ号) 格式
             content = re.sub(r"@[^\(]+\(\d+\)\s*", "", content)
@@ -219,6 +742,22 @@ class Main(Star):
             logger.debug(f"提取文本时属性错误: {e}")
             return ""
 
+    def _event_caps(self, event: AstrMessageEvent) -> tuple[bool, bool]:
+        """获取事件类型支持的可选方法（按事件类型缓存，避免每条消息都 hasattr）
+
+        Args:
+            event: 消息事件对象
+
+        Returns:
+            tuple[bool, bool]: (是否有 is_group_message, 是否有 get_sender_name)
+        """
+        cls = type(event)
+        caps = self._caps.get(cls)
+        if caps is None:
+            caps = (hasattr(cls, "is_group_message"), hasattr(cls, "get_sender_name"))
+            self._caps[cls] = caps
+        return caps
+
     def _is_group(self, event: AstrMessageEvent) -> bool:
         """判断是否为群聊消息
 
@@ -230,13 +769,12 @@ class Main(Star):
         """
         try:
             # 优先使用 message_obj.group_id 判断
-            if hasattr(event, "message_obj") and event.message_obj:
-                msg_obj = event.message_obj
-                if hasattr(msg_obj, "group_id") and msg_obj.group_id:
-                    return True
+            msg_obj = getattr(event, "message_obj", None)
+            if msg_obj and getattr(msg_obj, "group_id", None):
+                return True
             
             # 其次检查 is_group_message 方法
-            if hasattr(event, "is_group_message"):
+            if self._event_caps(event)[0]:
                 result = event.is_group_message()
                 if result:
                     return True
@@ -258,24 +796,52 @@ class Main(Star):
             bool: 是否应该备份
         """
         # 检查是否启用对应类型的备份
-        if is_group and not self.config.get("enable_group", True):
+        if is_group and not self._enable_group:
             return False
-        if not is_group and not self.config.get("enable_private", True):
+        if not is_group and not self._enable_private:
             return False
 
         # 检查群聊白名单/黑名单
         if is_group:
             group_id = str(event.get_group_id() or "")
-            whitelist = [str(x) for x in self.config.get("group_whitelist", [])]
-            blacklist = [str(x) for x in self.config.get("group_blacklist", [])]
-
-            if whitelist and group_id not in whitelist:
+            if self._whitelist and group_id not in self._whitelist:
                 return False
-            if group_id in blacklist:
+            if group_id in self._blacklist:
                 return False
 
         return True
 
+    def _resolve_chat(self, event: AstrMessageEvent) -> Optional[tuple[bool, str]]:
+        """判断事件所属聊天及是否需要备份
+
+        结果缓存在事件对象上，同一事件依次经过 on_message 和 on_bot_response
+        时只计算一次。
+
+        Args:
+            event: 消息事件对象
+
+        Returns:
+            Optional[tuple[bool, str]]: (是否为群聊, 聊天 ID)，不需要备份时为 None
+        """
+        chat = getattr(event, "_bkp_chat", _UNRESOLVED)
+        if chat is not _UNRESOLVED:
+            return chat
+
+        chat = None
+        is_group = self._is_group(event)
+        if self._should_backup(event, is_group):
+            # 获取聊天 ID
+            chat_id = event.get_group_id() if is_group else event.get_sender_id()
+            if chat_id:
+                chat = (is_group, chat_id)
+
+        try:
+            event._bkp_chat = chat
+        except AttributeError:
+            # 事件对象不允许添加属性（如定义了 __slots__）时不缓存
+            pass
+        return chat
+
     @filter.event_message_type(EventMessageType.ALL)
     async def on_message(self, event: AstrMessageEvent, *args, **kwargs):
         """监听接收到的消息
@@ -284,23 +850,18 @@ class Main(Star):
             event: 消息事件对象
         """
         try:
-            is_group = self._is_group(event)
-
-            if not self._should_backup(event, is_group):
+            chat = self._resolve_chat(event)
+            if not chat:
                 return
+            is_group, chat_id = chat
 
             content = self._extract_text(event)
             if not content:
                 return
 
-            # 获取聊天 ID
-            chat_id = event.get_group_id() if is_group else event.get_sender_id()
-            if not chat_id:
-                return
-
             sender_id = event.get_sender_id()
             sender_name = None
-            if hasattr(event, "get_sender_name"):
+            if self._event_caps(event)[1]:
                 sender_name = event.get_sender_name()
 
             self._save_message(
@@ -329,26 +890,20 @@ class Main(Star):
             if not result or not result.chain:
                 return
 
-            is_group = self._is_group(event)
-
-            if not self._should_backup(event, is_group):
+            chat = self._resolve_chat(event)
+            if not chat:
                 return
+            is_group, chat_id = chat
 
             # 提取回复内容
-            content_parts = []
-            for seg in result.chain:
-                if hasattr(seg, "text") and seg.text:
-                    content_parts.append(seg.text)
-
-            content = " ".join(content_parts).strip()
+            content = " ".join(
+                text
+                for text in (getattr(seg, "text", None) for seg in result.chain)
+                if text
+            ).strip()
             if not content:
                 return
 
-            # 获取聊天 ID
-            chat_id = event.get_group_id() if is_group else event.get_sender_id()
-            if not chat_id:
-                return
-
             self._save_message(
                 chat_id=chat_id, is_group=is_group, role="assistant", content=content
             )
@@ -360,6 +915,11 @@ class Main(Star):
 
     async def terminate(self):
         """插件卸载时的清理工作"""
+        # 交出本轮尚未入队的消息，再通知写入线程写完剩余消息后退出
+        for file_path in list(self._tick_buf):
+            self._flush_tick(file_path)
+        self._queue.put(_STOP)
+        await asyncio.to_thread(self._writer.join)
         if self.web_server:
             await self.web_server.stop()
         logger.info("📦 聊天记录备份插件已卸载")
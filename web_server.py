@@ -2,15 +2,51 @@
 WebUI 服务：聊天记录浏览
 """
 
+import asyncio
 import json
 import logging
+import mmap
+import os
+import re
 import secrets
+import threading
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
 
 from aiohttp import web
 
+from .main import _count_lines
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger("astrbot")
 
+# 读取文件末尾时每次向前多读的字节数
+_TAIL_BLOCK = 8192
+# 超过该大小（字节）的 JSON 响应启用压缩
+_COMPRESS_MIN_SIZE = 1024
+# 解析备份文件名（不含 .jsonl）中的聊天 ID 和类型，兼容轮转后带时间戳后缀的文件名
+_NAME_RE = re.compile(r"^(.+)_(private|group)(?:_\d{8}_\d{6})?$")
+# 并行读取文件摘要的线程数
+_SUMMARY_WORKERS = 8
+# 插件写入的记录中 timestamp 和 content 字段的固定字节前缀，用于快速提取预览
+_TS_PREFIX = b'{"timestamp":"'
+_CONTENT_KEY = b'"content":"'
+# 分页查询参数的上限
+_MAX_PAGE = 10_000_000
+_MAX_PAGE_SIZE = 500
+
+# 首页 HTML 直接以文件响应发送，可用时由内核通过 sendfile 零拷贝传输
+_INDEX_FILE = Path(__file__).parent / "static" / "index.html"
+# 只在导入时检查一次文件是否存在；之后被删除时由 FileResponse 在线程中发现并返回 404
+_INDEX_EXISTS = _INDEX_FILE.is_file()
+
 LOGIN_HTML = """<!DOCTYPE html>
 <html lang="zh">
 <head>
@@ -39,6 +75,193 @@ LOGIN_HTML = """<!DOCTYPE html>
 </html>"""
 
 
+def _loads(data: bytes):
+    """解析 JSON，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps(obj) -> bytes:
+    """序列化为 JSON 字节串，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _json_response(
+    data, status: int = 200, headers: Optional[dict] = None
+) -> web.Response:
+    """构造 JSON 响应（替代 web.json_response，以使用更快的序列化）
+
+    Args:
+        data: 响应数据，已序列化的 bytes 直接作为响应体
+        status: HTTP 状态码
+        headers: 额外的响应头
+
+    Returns:
+        web.Response: JSON 响应
+    """
+    body = data if isinstance(data, bytes) else _dumps(data)
+    response = web.Response(
+        body=body,
+        status=status,
+        headers=headers,
+        content_type="application/json",
+        charset="utf-8",
+    )
+    # 较大的响应按客户端的 Accept-Encoding 压缩传输
+    if len(body) > _COMPRESS_MIN_SIZE:
+        response.enable_compression()
+        response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def _int_arg(request, name: str, default: int, lo: int, hi: int) -> int:
+    """读取整数查询参数，并限制在 [lo, hi] 范围内
+
+    Args:
+        request: 请求对象
+        name: 参数名
+        default: 缺省值
+        lo: 最小值
+        hi: 最大值
+
+    Returns:
+        int: 参数值
+
+    Raises:
+        web.HTTPBadRequest: 参数不是整数
+    """
+    try:
+        value = int(request.query.get(name, default))
+    except ValueError:
+        raise web.HTTPBadRequest(
+            text=_dumps({"error": f"Invalid {name}"}).decode("utf-8"),
+            content_type="application/json",
+        )
+    return max(lo, min(hi, value))
+
+
+def _cached_response(request, data, etag: str) -> web.Response:
+    """构造带 ETag 的 JSON 响应，客户端缓存仍有效时返回 304
+
+    Args:
+        request: 请求对象
+        data: 响应数据（仅在需要返回完整内容时序列化）
+        etag: 当前内容的弱 ETag（压缩与未压缩的响应体共用，因此必须为弱校验器）
+
+    Returns:
+        web.Response: 304 响应或 JSON 响应
+    """
+    # 压缩与否由 Accept-Encoding 决定，304 和 200 都需声明 Vary
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if data is None or request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304, headers=headers)
+    return _json_response(data, headers=headers)
+
+
+def _index_lines(path, offsets: array) -> None:
+    """扫描文件，将尚未索引的每个换行符之后的偏移量追加到 offsets
+
+    offsets[i] 为第 i 行（含换行符）结束处的字节偏移量；已有的索引会被保留，
+    只扫描其后新追加的内容。
+
+    Args:
+        path: 文件路径
+        offsets: 行结束偏移量数组（就地扩展）
+    """
+    with open(path, "rb") as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            return
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            find = mm.find
+            pos = find(b"\n", offsets[-1] if offsets else 0)
+            while pos != -1:
+                pos += 1
+                offsets.append(pos)
+                pos = find(b"\n", pos)
+
+
+def _iter_jsonl(data_dir):
+    """遍历数据目录中的 .jsonl 文件
+
+    使用 os.scandir，DirEntry 自带文件名并缓存 stat 结果，避免重复的系统调用。
+
+    Args:
+        data_dir: 数据目录
+
+    Yields:
+        os.DirEntry: .jsonl 文件条目
+    """
+    try:
+        with os.scandir(data_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".jsonl") and entry.is_file():
+                    yield entry
+    except FileNotFoundError:
+        return
+
+
+def _read_last_line(path) -> bytes:
+    """从文件末尾向前读取最后一个非空行，无需读取整个文件
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        bytes: 最后一行内容（不含换行符），空文件返回 b""
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        size = os.lseek(fd, 0, os.SEEK_END)
+        block = _TAIL_BLOCK
+        while True:
+            length = min(size, block)
+            os.lseek(fd, size - length, os.SEEK_SET)
+            lines = os.read(fd, length).rstrip(b"\r\n").rsplit(b"\n", 1)
+            # 读到了换行符，或已读完整个文件
+            if len(lines) == 2 or length == size:
+                return lines[-1]
+            block *= 2
+    finally:
+        os.close(fd)
+
+
+def _preview(line: bytes) -> tuple[str, str]:
+    """从一条记录中取出消息内容预览（前 50 个字符）和时间戳
+
+    插件写入的记录以 timestamp 开头、content 在其他字符串字段之前，因此可以
+    直接在字节中定位这两个字段而无需解析整行。遇到转义字符或其他格式（如旧版
+    带空格的记录）时退回完整解析。
+
+    Args:
+        line: 一行 JSONL 记录
+
+    Returns:
+        tuple[str, str]: (内容预览, 时间戳)
+    """
+    ts_end = line.find(b'"', len(_TS_PREFIX))
+    if line.startswith(_TS_PREFIX) and ts_end != -1:
+        timestamp = line[len(_TS_PREFIX) : ts_end]
+        start = line.find(_CONTENT_KEY, ts_end)
+        if start != -1 and b"\\" not in timestamp:
+            start += len(_CONTENT_KEY)
+            # 50 个字符的 UTF-8 编码最多 200 字节
+            head = line[start : start + 200]
+            end = head.find(b'"')
+            if end != -1:
+                head = head[:end]
+            if b"\\" not in head:
+                return (
+                    head.decode("utf-8", errors="ignore")[:50],
+                    timestamp.decode("utf-8"),
+                )
+
+    msg = _loads(line)
+    return msg.get("content", "")[:50], msg.get("timestamp", "")
+
+
 class WebServer:
     """聊天记录备份 WebUI 服务器"""
 
@@ -49,6 +272,17 @@ class WebServer:
         self.password = password
         # 存储已登录的 session token
         self._tokens: set[str] = set()
+        # 文件摘要缓存：文件名 -> (mtime_ns, size, 最后消息时间, 序列化后的列表行)
+        self._meta_cache: dict[str, tuple] = {}
+        # 行偏移索引：文件名 -> (inode, 行结束偏移量数组)，用于分页时只读取所需的行
+        self._line_index: dict[str, tuple[int, array]] = {}
+        # 文件扫描在线程池中执行，行偏移索引需加锁防止并发扩展。每个文件一把锁，
+        # 大文件首次建立索引时不会阻塞其他聊天的分页请求
+        self._index_locks: dict[str, threading.Lock] = {}
+        # 生成聊天列表时并行读取多个文件摘要的线程池
+        self._pool = ThreadPoolExecutor(
+            max_workers=_SUMMARY_WORKERS, thread_name_prefix="history-webui"
+        )
         self.app = web.Application()
         self.runner = None
         self.site = None
@@ -59,6 +293,9 @@ class WebServer:
         self.app.router.add_get("/", self.handle_index)
         self.app.router.add_get("/api/chats", self.handle_list_chats)
         self.app.router.add_get("/api/chat/{filename}", self.handle_get_chat)
+        self.app.router.add_get(
+            "/api/chat/{filename}/ndjson", self.handle_get_chat_ndjson
+        )
         self.app.router.add_get("/api/stats", self.handle_stats)
         if self.password:
             self.app.router.add_get("/login", self.handle_login_page)
@@ -97,10 +334,12 @@ class WebServer:
             self.site = web.TCPSite(self.runner, self.host, self.port)
             await self.site.start()
             pwd_hint = "（已启用密码保护）" if self.password else "（无密码保护）"
-            logger.info(f"📊 聊天记录 WebUI 已启动: http://{self.host}:{self.port} {pwd_hint}")
+            logger.info(
+                "📊 聊天记录 WebUI 已启动: http://%s:%s %s", self.host, self.port, pwd_hint
+            )
             return True
         except Exception as e:
-            logger.error(f"❌ WebUI 启动失败: {e}")
+            logger.error("❌ WebUI 启动失败: %s", e)
             return False
 
     async def stop(self):
@@ -108,138 +347,324 @@ class WebServer:
         if self.runner:
             await self.runner.cleanup()
             logger.info("📊 聊天记录 WebUI 已停止")
+        self._pool.shutdown(wait=False)
+
+    def _summarize(
+        self, path: str, name: str, st: os.stat_result, chat_id: str, chat_type: str
+    ) -> tuple[str, bytes]:
+        """生成文件在聊天列表中的一行（消息条数、最后一条消息等）
+
+        每行在生成时即序列化为 JSON 片段。文件的 mtime 和大小未变化时直接返回
+        缓存的片段，不再重新读取文件，也不再重复序列化。
+
+        Args:
+            path: 文件路径
+            name: 文件名
+            st: 文件的 stat 结果
+            chat_id: 聊天 ID
+            chat_type: 聊天类型
+
+        Returns:
+            tuple[str, bytes]: (最后一条消息的时间, 该行序列化后的 JSON)
+        """
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._meta_cache.get(name)
+        if cached and cached[:2] == key:
+            return cached[2:]
+
+        msg_count = 0
+        last_message = last_time = ""
+        try:
+            msg_count = _count_lines(path)
+            last_line = _read_last_line(path)
+            if last_line:
+                last_message, last_time = _preview(last_line)
+        except Exception:
+            pass
+
+        row = {
+            "filename": name,
+            "chat_id": chat_id,
+            "type": chat_type,
+            "message_count": msg_count,
+            "size_kb": round(st.st_size / 1024, 1),
+            "last_message": last_message,
+            "last_time": last_time,
+        }
+        summary = (last_time, _dumps(row))
+        self._meta_cache[name] = (*key, *summary)
+        return summary
+
+    def _read_page(
+        self, filename: str, page: int, page_size: int
+    ) -> tuple[list[bytes], int]:
+        """按页读取文件中的原始行（第 1 页为最新的 page_size 行）
+
+        通过行偏移索引定位所需的字节范围，只读取这一页的内容。备份文件只会追加，
+        因此同一文件再次请求时只需为新追加的部分补充索引；文件被轮转（inode
+        变化）或变小时重新建立索引。
+
+        Args:
+            filename: 请求中的文件名
+            page: 页码（从 1 开始）
+            page_size: 每页条数
+
+        Returns:
+            tuple[list[bytes], int]: (按文件顺序排列的原始行, 总行数)
+
+        Raises:
+            FileNotFoundError: 文件名不合法或文件不存在
+        """
+        path = self._chat_file(filename)
+        if path is None:
+            raise FileNotFoundError(filename)
+
+        lock = self._index_locks.get(path.name)
+        if lock is None:
+            # setdefault 是原子操作，并发时所有线程拿到的是同一把锁
+            lock = self._index_locks.setdefault(path.name, threading.Lock())
+        with lock:
+            st = path.stat()
+            cached = self._line_index.get(path.name)
+            if (
+                cached
+                and cached[0] == st.st_ino
+                and (not cached[1] or cached[1][-1] <= st.st_size)
+            ):
+                offsets = cached[1]
+            else:
+                offsets = array("Q")
+                self._line_index[path.name] = (st.st_ino, offsets)
+            _index_lines(path, offsets)
+
+            total = len(offsets)
+            start = max(0, total - page * page_size)
+            end = max(0, total - (page - 1) * page_size)
+            if start >= end:
+                return [], total
+
+            lo = offsets[start - 1] if start else 0
+            hi = offsets[end - 1]
+
+        with open(path, "rb") as fp:
+            fp.seek(lo)
+            data = fp.read(hi - lo)
+        return data.splitlines(), total
+
+    def _scan_list(
+        self, filter_type: str, if_none_match: Optional[str] = None
+    ) -> tuple[Optional[bytes], str]:
+        """扫描数据目录，生成聊天列表（在线程中执行）
+
+        先根据过滤类型、文件名、文件数量、最大 mtime 和总大小计算 ETag，
+        与客户端缓存一致时不再读取文件生成列表。
+
+        Args:
+            filter_type: 聊天类型过滤（all/private/group）
+            if_none_match: 客户端携带的 ETag
+
+        Returns:
+            tuple[Optional[bytes], str]: (按最后消息时间倒序排列的聊天列表 JSON,
+                ETag)，ETag 与客户端一致时列表为 None
+        """
+        entries = [
+            (entry, entry.stat()) for entry in _iter_jsonl(self.plugin.data_dir)
+        ]
+        # 文件名集合（含过滤类型）的校验和用于感知重命名，mtime 和大小用于感知写入
+        names = "\0".join(sorted(entry.name for entry, _ in entries))
+        etag = 'W/"%x-%x-%x-%x"' % (
+            zlib.crc32(f"{filter_type}\0{names}".encode("utf-8")),
+            len(entries),
+            max((st.st_mtime_ns for _, st in entries), default=0),
+            sum(st.st_size for _, st in entries),
+        )
+        if etag == if_none_match:
+            return None, etag
+
+        selected = []
+        for entry, st in entries:
+            stem = entry.name[:-6]
+            match = _NAME_RE.match(stem)
+            if match:
+                chat_id, chat_type = match.groups()
+            else:
+                chat_id = stem
+                chat_type = "unknown"
+
+            if filter_type != "all" and chat_type != filter_type:
+                continue
+            selected.append((entry, st, chat_id, chat_type))
+
+        # 摘要缓存失效的文件需要重新读取，放到线程池中并行处理以重叠磁盘 I/O
+        misses = []
+        for entry, st, chat_id, chat_type in selected:
+            cached = self._meta_cache.get(entry.name)
+            if not cached or cached[:2] != (st.st_mtime_ns, st.st_size):
+                misses.append((entry.path, entry.name, st, chat_id, chat_type))
+        if len(misses) > 1:
+            list(self._pool.map(lambda args: self._summarize(*args), misses))
+
+        rows = [
+            self._summarize(entry.path, entry.name, st, chat_id, chat_type)
+            for entry, st, chat_id, chat_type in selected
+        ]
+        rows.sort(key=lambda x: x[0], reverse=True)
+        # 直接拼接缓存的 JSON 片段，不再整体序列化
+        return b"[" + b",".join(fragment for _, fragment in rows) + b"]", etag
 
     async def handle_index(self, request):
         """返回首页 HTML"""
         if not self._check_auth(request):
             return self._auth_redirect()
 
-        static_dir = Path(__file__).parent / "static"
-        index_file = static_dir / "index.html"
-
-        if index_file.exists():
-            html = index_file.read_text(encoding="utf-8")
-        else:
-            html = "<h1>404 - index.html not found</h1>"
-
-        return web.Response(text=html, content_type="text/html")
+        if not _INDEX_EXISTS:
+            return web.Response(
+                text="<h1>404 - index.html not found</h1>",
+                content_type="text/html",
+            )
+
+        # 不使用 add_static 挂载，以免绕过上面的登录校验
+        return web.FileResponse(
+            _INDEX_FILE,
+            headers={
+                "Content-Type": "text/html; charset=utf-8",
+                # 页面受登录保护，不允许共享代理缓存
+                "Cache-Control": "private, max-age=3600",
+            },
+        )
 
     async def handle_list_chats(self, request):
         """获取聊天列表"""
         if not self._check_auth(request):
-            return web.json_response({"error": "Unauthorized"}, status=401)
+            return _json_response({"error": "Unauthorized"}, status=401)
 
-        chats = []
-        data_dir = self.plugin.data_dir
         filter_type = request.query.get("type", "all")
+        # 扫描目录和读取文件会阻塞，放到线程中执行以免阻塞事件循环
+        chats, etag = await asyncio.to_thread(
+            self._scan_list, filter_type, request.headers.get("If-None-Match")
+        )
+        return _cached_response(request, chats, etag)
 
-        if data_dir.exists():
-            for f in data_dir.glob("*.jsonl"):
-                parts = f.stem.rsplit("_", 1)
-                if len(parts) == 2:
-                    chat_id, chat_type = parts
-                else:
-                    chat_id = f.stem
-                    chat_type = "unknown"
-
-                if filter_type != "all" and chat_type != filter_type:
-                    continue
-
-                msg_count = 0
-                last_msg = None
-                try:
-                    with open(f, "r", encoding="utf-8") as fp:
-                        lines = fp.readlines()
-                        msg_count = len(lines)
-                        if lines:
-                            last_msg = json.loads(lines[-1])
-                except Exception:
-                    pass
-
-                chats.append(
-                    {
-                        "filename": f.name,
-                        "chat_id": chat_id,
-                        "type": chat_type,
-                        "message_count": msg_count,
-                        "size_kb": round(f.stat().st_size / 1024, 1),
-                        "last_message": (
-                            last_msg.get("content", "")[:50] if last_msg else ""
-                        ),
-                        "last_time": last_msg.get("timestamp", "") if last_msg else "",
-                    }
-                )
+    def _chat_file(self, filename: str) -> Optional[Path]:
+        """校验请求的文件名，返回数据目录中对应的备份文件路径
+
+        只接受数据目录下的 .jsonl 普通文件，拒绝包含路径分隔符或指向目录外的
+        文件名（aiohttp 会将 {filename} 中的 %2F 解码为 /）。会访问文件系统，
+        需在线程中调用。
 
-        chats.sort(key=lambda x: x["last_time"], reverse=True)
-        return web.json_response(chats)
+        Args:
+            filename: 请求中的文件名
+
+        Returns:
+            Optional[Path]: 文件路径，文件名不合法或不是普通文件时为 None
+        """
+        if filename != os.path.basename(filename) or not filename.endswith(".jsonl"):
+            return None
+        data_dir = Path(self.plugin.data_dir).resolve()
+        file_path = (data_dir / filename).resolve()
+        if file_path.parent != data_dir or not file_path.is_file():
+            return None
+        return file_path
 
     async def handle_get_chat(self, request):
         """获取单个聊天的消息"""
         if not self._check_auth(request):
-            return web.json_response({"error": "Unauthorized"}, status=401)
+            return _json_response({"error": "Unauthorized"}, status=401)
 
         filename = request.match_info["filename"]
-        file_path = self.plugin.data_dir / filename
-
-        if not file_path.exists():
-            return web.json_response({"error": "Chat not found"}, status=404)
 
-        page = int(request.query.get("page", 1))
-        page_size = int(request.query.get("size", 50))
+        page = _int_arg(request, "page", 1, 1, _MAX_PAGE)
+        page_size = _int_arg(request, "size", 50, 1, _MAX_PAGE_SIZE)
 
         messages = []
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                total = len(lines)
-
-                start = max(0, total - page * page_size)
-                end = total - (page - 1) * page_size
-
-                for line in lines[start:end]:
+            lines, total = await asyncio.to_thread(
+                self._read_page, filename, page, page_size
+            )
+            lines = [line for line in lines if line.strip()]
+            # 将整页拼接为一个 JSON 数组一次解析，存在损坏的行时再逐行解析
+            try:
+                messages = _loads(b"[" + b",".join(lines) + b"]")
+            except Exception:
+                for line in lines:
                     try:
-                        messages.append(json.loads(line.strip()))
+                        messages.append(_loads(line))
                     except Exception:
                         pass
 
-                messages.reverse()
+            messages.reverse()
 
+        except FileNotFoundError:
+            # 文件是否存在由线程中的 stat 判断，不在事件循环中额外检查
+            return _json_response({"error": "Chat not found"}, status=404)
         except Exception as e:
-            return web.json_response({"error": str(e)}, status=500)
+            return _json_response({"error": str(e)}, status=500)
 
-        return web.json_response(
+        return _json_response(
             {"messages": messages, "total": total, "page": page, "page_size": page_size}
         )
 
-    async def handle_stats(self, request):
-        """获取统计信息"""
+    async def handle_get_chat_ndjson(self, request):
+        """以 NDJSON 流式返回单个聊天的消息
+
+        直接转发文件中的原始行（每行一条消息，最新的在前），不解析也不重新序列化。
+        总条数通过 X-Total-Count 响应头返回。
+        """
         if not self._check_auth(request):
-            return web.json_response({"error": "Unauthorized"}, status=401)
+            return _json_response({"error": "Unauthorized"}, status=401)
 
-        data_dir = self.plugin.data_dir
-        stats = {
-            "total_chats": 0,
-            "total_messages": 0,
-            "total_size_mb": 0,
-            "private_chats": 0,
-            "group_chats": 0,
-        }
+        filename = request.match_info["filename"]
 
-        if data_dir.exists():
-            for f in data_dir.glob("*.jsonl"):
-                stats["total_chats"] += 1
-                stats["total_size_mb"] += f.stat().st_size / (1024 * 1024)
+        page = _int_arg(request, "page", 1, 1, _MAX_PAGE)
+        page_size = _int_arg(request, "size", 50, 1, _MAX_PAGE_SIZE)
 
-                if "_private" in f.name:
-                    stats["private_chats"] += 1
-                elif "_group" in f.name:
-                    stats["group_chats"] += 1
+        try:
+            lines, total = await asyncio.to_thread(
+                self._read_page, filename, page, page_size
+            )
+        except FileNotFoundError:
+            return _json_response({"error": "Chat not found"}, status=404)
+        except Exception as e:
+            return _json_response({"error": str(e)}, status=500)
+
+        response = web.StreamResponse(
+            headers={
+                "Content-Type": "application/x-ndjson; charset=utf-8",
+                "X-Total-Count": str(total),
+                "Vary": "Accept-Encoding",
+            }
+        )
+        response.enable_compression()
+        await response.prepare(request)
+        for line in reversed(lines):
+            if line.strip():
+                await response.write(line + b"\n")
+        await response.write_eof()
+        return response
 
-                try:
-                    with open(f, "r", encoding="utf-8") as fp:
-                        stats["total_messages"] += len(fp.readlines())
-                except Exception:
-                    pass
+    async def handle_stats(self, request):
+        """获取统计信息"""
+        if not self._check_auth(request):
+            return _json_response({"error": "Unauthorized"}, status=401)
+
+        # 插件在写入时增量维护统计快照，无需扫描目录
+        snapshot = self.plugin.stats
+        etag = 'W/"%x-%x-%x-%d"' % (
+            snapshot["total_chats"],
+            snapshot["total_messages"],
+            snapshot["total_size_bytes"],
+            snapshot["loading"],
+        )
+        if request.headers.get("If-None-Match") == etag:
+            return _cached_response(request, None, etag)
 
-        stats["total_size_mb"] = round(stats["total_size_mb"], 2)
-        return web.json_response(stats)
+        stats = {
+            "total_chats": snapshot["total_chats"],
+            "total_messages": snapshot["total_messages"],
+            "total_size_mb": round(snapshot["total_size_bytes"] / (1024 * 1024), 2),
+            "private_chats": snapshot["private_chats"],
+            "group_chats": snapshot["group_chats"],
+            # 启动时的已有文件统计尚未完成
+            "loading": snapshot["loading"],
+        }
+        return _cached_response(request, stats, etag)